@@ -0,0 +1,90 @@
+"""
+Spread kernel for ArbitrageEngine
+Compiled with Numba when it is installed, NumPy fallback otherwise
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Prices are quantized to int16 units of $0.0001, so [0, 1] maps to [0, 10000]
+PRICE_SCALE = 10_000
+
+
+def _find_opps_loop(eids, pids, mids, ratio):
+    # int64 products: mid * PRICE_SCALE and mid * ratio cannot overflow
+    n = eids.shape[0]
+    buys = np.empty(n, dtype=np.int64)
+    sells = np.empty(n, dtype=np.int64)
+    k = 0
+    i = 0
+    while i < n:
+        eid = eids[i]
+        lo = -1
+        hi = -1
+        n_platforms = 0
+        j = i
+        while j < n and eids[j] == eid:
+            # Last entry of each platform run wins, as in {p.platform: p}
+            if j + 1 == n or eids[j + 1] != eid or pids[j + 1] != pids[j]:
+                n_platforms += 1
+                if lo < 0 or mids[j] < mids[lo]:
+                    lo = j
+                if hi < 0 or mids[j] > mids[hi]:
+                    hi = j
+            j += 1
+
+        if (n_platforms >= 2 and mids[lo] > 0
+                and np.int64(mids[hi]) * PRICE_SCALE >= np.int64(mids[lo]) * ratio):
+            buys[k] = lo
+            sells[k] = hi
+            k += 1
+        i = j
+
+    return buys[:k], sells[:k]
+
+
+def _find_opps_numpy(eids, pids, mids, ratio):
+    n = eids.shape[0]
+
+    # Last entry of each (event, platform) run wins, as in {p.platform: p}
+    last = np.ones(n, dtype=bool)
+    last[:-1] = (eids[1:] != eids[:-1]) | (pids[1:] != pids[:-1])
+    idx = np.flatnonzero(last)
+
+    # Within each event segment, order by mid ascending for the buy and
+    # descending for the sell. The sorts are stable, so on a tied mid both
+    # pick the first platform, as the strict compares in the loop do
+    e = eids[idx]
+    m = mids[idx].astype(np.int64)
+    asc = idx[np.lexsort((m, e))]
+    desc = idx[np.lexsort((-m, e))]
+    new_event = np.ones(len(idx), dtype=bool)
+    new_event[1:] = e[1:] != e[:-1]
+    starts = np.flatnonzero(new_event)
+    ends = np.append(starts[1:], len(idx)) - 1
+
+    buys = asc[starts]
+    sells = desc[starts]
+    lo = mids[buys].astype(np.int64)
+    hi = mids[sells].astype(np.int64)
+    hit = (ends > starts) & (lo > 0) & (hi * PRICE_SCALE >= lo * ratio)
+    return buys[hit], sells[hit]
+
+
+# find_opps(eids, pids, mids, ratio) -> (buy_idx, sell_idx)
+#
+# Inputs are sorted by (event id, platform id); mids are int16 in
+# PRICE_SCALE units and ratio is the threshold ratio times PRICE_SCALE.
+# For every event with at least two platforms whose max mid is >= min
+# mid * ratio, returns the positions of the cheapest and priciest
+# entries. Quantized mids only decide the threshold; the caller reports
+# the spread from the exact prices.
+if njit is not None:
+    # nogil lets the kernel run in parallel with the event loop thread
+    find_opps = njit(nogil=True, cache=True)(_find_opps_loop)
+else:
+    find_opps = _find_opps_numpy
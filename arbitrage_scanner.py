@@ -4,15 +4,29 @@ Arbitrage Scanner for Kalshi, Polymarket, and OPINION
 Finds profitable trading opportunities across prediction markets
 """
 
+import abc
 import asyncio
 import aiohttp
+import ijson
+import numpy as np
+import orjson
+import re
+import socket
+import sys
 import time
-from typing import Dict, List
-from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 from collections import defaultdict
 import logging
 
+from _spreads import PRICE_SCALE, find_opps
+
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -21,8 +35,25 @@ logger = logging.getLogger(__name__)
 
 MIN_SPREAD_PCT = 2.5
 POLL_INTERVAL = 5
+# Max in-flight requests per API host, shared by the connector and collectors
+MAX_CONCURRENCY = 8
+# Token-set Jaccard similarity at which two titles count as the same event
+MATCH_THRESHOLD = 0.7
+# Window for batching a burst of feed updates into one scan
+FEED_COALESCE = 0.05
+FEED_RECONNECT_DELAY = 5
+# A feed silent this long is assumed stuck and reconnected (with a REST resync)
+FEED_STALE_AFTER = 60
+# How often a connected feed checks the markets list for added/removed markets
+FEED_RESYNC_INTERVAL = 600
+
+EventKey = Tuple[str, str]
 
-@dataclass
+def event_key(name: str, outcome: str) -> EventKey:
+    """Grouping key for a market: interned lower-cased name plus outcome"""
+    return (sys.intern(name.lower()), outcome)
+
+@dataclass(slots=True)
 class MarketPrice:
     platform: str
     event_id: str
@@ -31,143 +62,531 @@ class MarketPrice:
     bid: float
     ask: float
     timestamp: float
+    mid: float = field(init=False)
+    mid_cpp: int = field(init=False, repr=False)
+    # Collectors pass the key cached with their markets list; derived otherwise
+    key: Optional[EventKey] = field(default=None, repr=False)
     
-    @property
-    def mid(self) -> float:
-        return (self.bid + self.ask) / 2 if self.bid and self.ask else 0.5
+    def __post_init__(self):
+        # Quotes must be probabilities: a cents-valued book would overflow the
+        # engine's int16 mids, so collectors drop it here via ValueError
+        for price in (self.bid, self.ask):
+            if price and not 0.0 <= price <= 1.0:
+                raise ValueError(f"{self.platform} {self.event_id}: price {price} outside [0, 1]")
+        # Derived once at ingestion rather than on every scan
+        self.mid = (self.bid + self.ask) / 2 if self.bid and self.ask else 0.5
+        self.mid_cpp = round(self.mid * PRICE_SCALE)
+        if self.key is None:
+            self.key = event_key(self.event_name, self.outcome)
+
+async def _json(resp: aiohttp.ClientResponse):
+    """Decode a response body with orjson, skipping aiohttp's content-type check"""
+    return orjson.loads(await resp.read())
+
+def _level(level) -> Tuple[float, float]:
+    """(price, size) of a book level, sent either as {"price", "size"} or [price, size]"""
+    if isinstance(level, dict):
+        return float(level["price"]), float(level["size"])
+    return float(level[0]), float(level[1])
+
+def _book_side(levels) -> Dict[float, float]:
+    """price -> size for one side of a book, skipping empty levels"""
+    return {price: size for price, size in map(_level, levels or ()) if size}
+
+def _top(bids: Dict[float, float], asks: Dict[float, float]) -> Tuple[Optional[float], Optional[float]]:
+    """Best bid and ask of a book, whatever order its levels were sent in"""
+    return (max(bids) if bids else None), (min(asks) if asks else None)
+
+async def _top_of_book(resp: aiohttp.ClientResponse) -> Tuple[Optional[float], Optional[float]]:
+    """Stream-parse an orderbook body, building only its bids and asks"""
+    bids = asks = None
+    async for name, value in ijson.kvitems_async(resp.content, "", use_float=True):
+        if name == "bids":
+            bids = value
+        elif name == "asks":
+            asks = value
+    return _top(_book_side(bids), _book_side(asks))
+
+def create_session() -> aiohttp.ClientSession:
+    """One pooled keep-alive session shared by every collector for the whole run"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=MAX_CONCURRENCY,
+            # c-ares lookups on the loop, cached long; IPv4 only to skip AAAA queries
+            resolver=aiohttp.AsyncResolver(),
+            family=socket.AF_INET,
+            use_dns_cache=True,
+            ttl_dns_cache=600,
+            keepalive_timeout=60
+        )
+    )
 
-class KalshiCollector:
-    def __init__(self):
+class HTTPCollector(abc.ABC):
+    """Base for collectors that poll a REST API over the shared session"""
+    
+    # Max in-flight orderbook requests per API; override per collector
+    max_concurrency = MAX_CONCURRENCY
+    
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        # url -> (etag, last_modified, parsed markets) for conditional GETs
+        self._meta_cache: Dict[str, Tuple[str, str, List[Tuple[str, str, EventKey]]]] = {}
+    
+    @abc.abstractmethod
+    def _parse_market(self, market: Dict) -> Tuple[str, str, EventKey]:
+        """Return (market_id, title, event key) for one raw markets-list entry"""
+    
+    async def _get_markets(self, session: aiohttp.ClientSession, url: str,
+                           params: Optional[Dict] = None,
+                           limit: Optional[int] = None) -> List[Tuple[str, str, EventKey]]:
+        """GET a markets list, reusing the cached copy when the server answers 304
+        
+        Only the first `limit` entries are parsed when the API can't page server-side.
+        """
+        headers = {}
+        cached = self._meta_cache.get(url)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        
+        async with session.get(
+            url,
+            params=params,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as resp:
+            if resp.status == 304 and cached:
+                return cached[2]
+            if resp.status != 200:
+                return []
+            data = await _json(resp)
+            markets = [self._parse_market(m) for m in data.get("markets", [])[:limit]]
+            etag = resp.headers.get("ETag", "")
+            last_modified = resp.headers.get("Last-Modified", "")
+            if etag or last_modified:
+                self._meta_cache[url] = (etag, last_modified, markets)
+            return markets
+    
+    def _collect(self, results: List) -> List[MarketPrice]:
+        """Keep the prices from a gather(return_exceptions=True), logging every failure"""
+        prices = []
+        for r in results:
+            if isinstance(r, asyncio.CancelledError):
+                raise r
+            if isinstance(r, BaseException):
+                logger.error(f"{type(self).__name__} orderbook task failed: {r!r}")
+            elif isinstance(r, MarketPrice):
+                prices.append(r)
+        return prices
+
+def _kalshi_dollars(bid, ask) -> Tuple:
+    """Kalshi quotes in whole cents (1-99); convert to dollars, passing dollar quotes through"""
+    if (bid or 0) > 1 or (ask or 0) > 1:
+        return bid and bid / 100, ask and ask / 100
+    return bid, ask
+
+class KalshiCollector(HTTPCollector):
+    def __init__(self, session: aiohttp.ClientSession):
+        super().__init__(session)
         self.base_url = "https://trading-api.kalshi.com/v1"
     
+    def _parse_market(self, market: Dict) -> Tuple[str, str, EventKey]:
+        title = market.get("title", "")
+        return market.get("market_id", ""), title, event_key(title, "YES")
+    
     async def fetch_markets(self) -> List[MarketPrice]:
         prices = []
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/markets",
-                    params={"status": "active", "limit": 30},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        markets = data.get("markets", [])
-                        for market in markets:
-                            market_id = market.get("market_id", "")
-                            title = market.get("title", "")
-                            try:
-                                async with session.get(
-                                    f"{self.base_url}/orderbooks/{market_id}",
-                                    timeout=aiohttp.ClientTimeout(total=5)
-                                ) as ob_resp:
-                                    if ob_resp.status == 200:
-                                        ob = await ob_resp.json()
-                                        prices.append(MarketPrice(
-                                            platform="Kalshi",
-                                            event_id=market_id,
-                                            event_name=title,
-                                            outcome="YES",
-                                            bid=ob.get("yes_bid", 0.5),
-                                            ask=ob.get("yes_ask", 0.5),
-                                            timestamp=time.time()
-                                        ))
-                            except:
-                                pass
+            session = self.session
+            markets = await self._get_markets(
+                session,
+                f"{self.base_url}/markets",
+                params={"status": "active", "limit": 30}
+            )
+            
+            results = await asyncio.gather(
+                *[self._fetch_one(session, market_id, title, key)
+                  for market_id, title, key in markets],
+                return_exceptions=True
+            )
+            prices = self._collect(results)
         except Exception as e:
             logger.error(f"Kalshi error: {e}")
         
         logger.info(f"Kalshi: {len(prices)} prices")
         return prices
+    
+    async def _fetch_one(self, session: aiohttp.ClientSession, market_id: str,
+                         title: str, key: EventKey) -> Optional[MarketPrice]:
+        try:
+            async with self._sem:
+                async with session.get(
+                    f"{self.base_url}/orderbooks/{market_id}",
+                    timeout=aiohttp.ClientTimeout(total=5)
+                ) as ob_resp:
+                    if ob_resp.status == 200:
+                        ob = await _json(ob_resp)
+                        bid, ask = _kalshi_dollars(ob.get("yes_bid", 0.5), ob.get("yes_ask", 0.5))
+                        return MarketPrice(
+                            platform="Kalshi",
+                            event_id=market_id,
+                            event_name=title,
+                            outcome="YES",
+                            bid=bid,
+                            ask=ask,
+                            timestamp=time.time(),
+                            key=key
+                        )
+        except (TypeError, ValueError) as e:
+            # Bad body or out-of-range quote: a unit change would hide every Kalshi price
+            logger.warning(f"Kalshi orderbook {market_id} rejected: {e}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug(f"Kalshi orderbook {market_id} error: {e}")
+        return None
 
-class PolymarketCollector:
-    def __init__(self):
+class PolymarketCollector(HTTPCollector):
+    def __init__(self, session: aiohttp.ClientSession):
+        super().__init__(session)
         self.api_url = "https://clob.polymarket.com"
+        # condition_id -> YES token id, which the websocket feed is keyed by
+        self.token_ids: Dict[str, str] = {}
+    
+    def _parse_market(self, market: Dict) -> Tuple[str, str, EventKey]:
+        title = market.get("question", "")
+        condition_id = market.get("condition_id", "")
+        for token in market.get("tokens", ()):
+            if str(token.get("outcome", "")).lower() == "yes":
+                self.token_ids[condition_id] = token.get("token_id", "")
+        return condition_id, title, event_key(title, "YES")
+    
+    async def list_markets(self) -> List[Tuple[str, str, EventKey]]:
+        return await self._get_markets(self.session, f"{self.api_url}/markets", limit=30)
     
     async def fetch_markets(self) -> List[MarketPrice]:
         prices = []
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.api_url}/markets",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        markets = data.get("markets", [])[:30]
-                        for market in markets:
-                            market_id = market.get("condition_id", "")
-                            title = market.get("question", "")
-                            try:
-                                async with session.get(
-                                    f"{self.api_url}/orderbooks/{market_id}",
-                                    timeout=aiohttp.ClientTimeout(total=5)
-                                ) as ob_resp:
-                                    if ob_resp.status == 200:
-                                        ob = await ob_resp.json()
-                                        bids = ob.get("bids", [])
-                                        asks = ob.get("asks", [])
-                                        if bids and asks:
-                                            prices.append(MarketPrice(
-                                                platform="Polymarket",
-                                                event_id=market_id,
-                                                event_name=title,
-                                                outcome="YES",
-                                                bid=float(bids[0][0]),
-                                                ask=float(asks[0][0]),
-                                                timestamp=time.time()
-                                            ))
-                            except:
-                                pass
+            session = self.session
+            markets = await self.list_markets()
+            
+            results = await asyncio.gather(
+                *[self._fetch_one(session, market_id, title, key)
+                  for market_id, title, key in markets],
+                return_exceptions=True
+            )
+            prices = self._collect(results)
         except Exception as e:
             logger.error(f"Polymarket error: {e}")
         
         logger.info(f"Polymarket: {len(prices)} prices")
         return prices
+    
+    async def _fetch_one(self, session: aiohttp.ClientSession, market_id: str,
+                         title: str, key: EventKey) -> Optional[MarketPrice]:
+        try:
+            async with self._sem:
+                async with session.get(
+                    f"{self.api_url}/orderbooks/{market_id}",
+                    timeout=aiohttp.ClientTimeout(total=5)
+                ) as ob_resp:
+                    if ob_resp.status == 200:
+                        bid, ask = await _top_of_book(ob_resp)
+                        if bid is not None and ask is not None:
+                            return MarketPrice(
+                                platform="Polymarket",
+                                event_id=market_id,
+                                event_name=title,
+                                outcome="YES",
+                                bid=bid,
+                                ask=ask,
+                                timestamp=time.time(),
+                                key=key
+                            )
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Polymarket orderbook {market_id} rejected: {e!r}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ijson.JSONError) as e:
+            logger.debug(f"Polymarket orderbook {market_id} error: {e}")
+        return None
+
+class PolymarketWSCollector:
+    """Polymarket top of book kept live from the market websocket channel"""
+    
+    def __init__(self, session: aiohttp.ClientSession, updated: asyncio.Event):
+        self.session = session
+        self.ws_url = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+        # REST collector for the cold-start snapshot and resyncs on reconnect
+        self.snapshot = PolymarketCollector(session)
+        # Both keyed by YES token id, as the feed's asset_id is
+        self.books: Dict[str, MarketPrice] = {}
+        self._levels: Dict[str, Tuple[Dict[float, float], Dict[float, float]]] = {}
+        self.updated = updated
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        await self._load_snapshot()
+        self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def prices(self) -> List[MarketPrice]:
+        return list(self.books.values())
+    
+    async def _load_snapshot(self):
+        prices = await self.snapshot.fetch_markets()
+        token_ids = self.snapshot.token_ids
+        self.books = {token_ids[p.event_id]: p for p in prices if token_ids.get(p.event_id)}
+        self.updated.set()
+    
+    async def _run(self):
+        while True:
+            if self.books:
+                try:
+                    await self._stream()
+                except Exception as e:
+                    logger.error(f"Polymarket feed error: {e}")
+                    await asyncio.sleep(FEED_RECONNECT_DELAY)
+            else:
+                await asyncio.sleep(FEED_RECONNECT_DELAY)
+            # Resync anything missed while disconnected, and pick up market changes
+            await self._load_snapshot()
+    
+    async def _listed_assets(self) -> FrozenSet[str]:
+        """YES token ids of the current markets list (usually a 304 from cache)"""
+        markets = await self.snapshot.list_markets()
+        token_ids = self.snapshot.token_ids
+        return frozenset(token_ids[m] for m, _, _ in markets if token_ids.get(m))
+    
+    async def _stream(self):
+        """Apply feed updates until the socket drops or goes silent, or the markets change"""
+        loop = asyncio.get_running_loop()
+        listed = await self._listed_assets()
+        self._levels = {}
+        async with self.session.ws_connect(self.ws_url, heartbeat=30) as ws:
+            await ws.send_json({"type": "market", "assets_ids": list(self.books)})
+            logger.info(f"Polymarket feed: subscribed to {len(self.books)} markets")
+            next_resync = loop.time() + FEED_RESYNC_INTERVAL
+            while True:
+                try:
+                    msg = await ws.receive(timeout=FEED_STALE_AFTER)
+                except asyncio.TimeoutError:
+                    raise ConnectionError(f"no messages for {FEED_STALE_AFTER}s")
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._apply(msg.data)
+                elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                                  aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    raise ConnectionError(f"websocket closed ({msg.type.name})")
+                
+                # Prices come only from the feed while connected; REST just
+                # rechecks which markets to subscribe to
+                if loop.time() >= next_resync:
+                    if await self._listed_assets() != listed:
+                        return
+                    next_resync = loop.time() + FEED_RESYNC_INTERVAL
+    
+    def _apply(self, raw: str):
+        """Apply one feed message, skipping malformed events rather than dropping the socket"""
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            logger.debug(f"Polymarket feed message error: {e}")
+            return
+        for event in data if isinstance(data, list) else [data]:
+            try:
+                self._apply_event(event)
+            except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+                logger.debug(f"Polymarket feed event error: {e!r}")
+    
+    def _apply_event(self, event: Dict):
+        event_type = event.get("event_type")
+        if event_type == "book":
+            asset_id = event.get("asset_id")
+            if asset_id in self.books:
+                # Full book: replaces whatever depth we held for the asset
+                self._levels[asset_id] = (_book_side(event.get("bids")), _book_side(event.get("asks")))
+                self._publish(asset_id)
+        elif event_type == "price_change":
+            for change in event.get("price_changes") or event.get("changes") or ():
+                asset_id = change.get("asset_id", event.get("asset_id"))
+                levels = self._levels.get(asset_id)
+                if levels is None:
+                    continue  # no book yet to apply the delta to
+                price, size = _level(change)
+                side = levels[0] if change.get("side") == "BUY" else levels[1]
+                if size:
+                    side[price] = size
+                else:
+                    side.pop(price, None)
+                self._publish(asset_id)
+    
+    def _publish(self, asset_id: str):
+        """Replace the asset's price with the current top of its book"""
+        old = self.books.get(asset_id)
+        bid, ask = _top(*self._levels[asset_id])
+        if old is None or bid is None or ask is None:
+            return
+        try:
+            self.books[asset_id] = MarketPrice(
+                platform=old.platform,
+                event_id=old.event_id,
+                event_name=old.event_name,
+                outcome=old.outcome,
+                bid=bid,
+                ask=ask,
+                timestamp=time.time(),
+                key=old.key
+            )
+        except ValueError as e:
+            logger.debug(f"Polymarket feed {asset_id} error: {e}")
+            return
+        self.updated.set()
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "at", "be", "by", "for", "in", "is", "of", "on", "or", "the", "to", "will"
+})
+# Month names folded to one spelling, so "Dec 31" and "December 31" agree
+_MONTHS = {
+    "january": "jan", "february": "feb", "march": "mar", "april": "apr", "june": "jun",
+    "july": "jul", "august": "aug", "sept": "sep", "september": "sep", "october": "oct",
+    "november": "nov", "december": "dec"
+}
+_MONTH_TOKENS = frozenset(_MONTHS.values()) | {"may"}
+# Direction, comparator and negation words: "above" vs "below" or "cut" vs
+# "not cut" flip a market's meaning while barely moving the token overlap
+_POLARITY = frozenset({
+    "above", "below", "over", "under", "higher", "lower", "more", "less", "fewer",
+    "greater", "most", "least", "up", "down", "rise", "fall", "increase", "decrease",
+    "exceed", "before", "after", "not", "no", "never", "win", "lose", "beat", "miss",
+    "pass", "fail", "approve", "reject"
+})
+
+def _fold(t: str) -> str:
+    """Month names to their abbreviation, crude plurals to the singular"""
+    if t in _MONTHS:
+        return _MONTHS[t]
+    if t in _POLARITY:
+        return t
+    return t[:-1] if len(t) > 3 and t.endswith("s") else t
+
+def title_tokens(name: str) -> FrozenSet[str]:
+    """Normalized token set of a lower-cased title, with crude plural and month folding"""
+    return frozenset(_fold(t) for t in _TOKEN_RE.findall(name) if t not in _STOPWORDS)
+
+def pinned_tokens(tokens: FrozenSet[str]) -> FrozenSet[str]:
+    """Numeric, date and polarity tokens, which must agree exactly for titles to match"""
+    return frozenset(
+        t for t in tokens
+        if t in _MONTH_TOKENS or t in _POLARITY or any(c.isdigit() for c in t)
+    )
+
+class EventMatcher:
+    """Maps event keys to event ids, sharing an id between near-identical titles
+    
+    Platforms word the same question differently, so exact key equality
+    almost never matches across them. Each new key is compared (Jaccard
+    over title tokens) against the events sharing at least one token via
+    an inverted index, and the result is cached so later scans are a
+    single dict lookup.
+    
+    Titles differing only in a strike, date or direction ("above 100k" /
+    "above 110k" / "below 100k") score high but are different markets, so
+    numbers, dates and polarity words must match exactly. Nor is a key merged into an event its own platform already
+    has a market in, since one platform never lists the same question twice.
+    """
+    
+    def __init__(self, threshold: float = MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._ids: Dict[Tuple[str, EventKey], int] = {}
+        # Per event id: tokens and pinned tokens of the first title seen for
+        # it, its outcome, and the platforms with a market in it
+        self._events: List[Tuple[FrozenSet[str], FrozenSet[str], str, set]] = []
+        self._index: Dict[str, List[int]] = defaultdict(list)
+    
+    def event_id(self, key: EventKey, platform: str) -> int:
+        eid = self._ids.get((platform, key))
+        if eid is None:
+            eid = self._ids[(platform, key)] = self._match(key, platform)
+        return eid
+    
+    def _match(self, key: EventKey, platform: str) -> int:
+        name, outcome = key
+        tokens = title_tokens(name)
+        pinned = pinned_tokens(tokens)
+        
+        best, best_score = -1, 0.0
+        for eid in {e for t in tokens for e in self._index.get(t, ())}:
+            event_tokens, event_pinned, event_outcome, platforms = self._events[eid]
+            if event_outcome != outcome or event_pinned != pinned or platform in platforms:
+                continue
+            score = len(tokens & event_tokens) / len(tokens | event_tokens)
+            if score > best_score:
+                best, best_score = eid, score
+        
+        if best >= 0 and best_score >= self.threshold:
+            self._events[best][3].add(platform)
+            return best
+        
+        eid = len(self._events)
+        self._events.append((tokens, pinned, outcome, {platform}))
+        for t in tokens:
+            self._index[t].append(eid)
+        return eid
 
 class ArbitrageEngine:
     def __init__(self, min_spread: float = 2.5):
         self.min_spread = min_spread
         self.fee_pct = 1.0
+        # mx/mn ratio a spread must reach to clear fees on both legs + min_spread
+        self._ratio = 1.0 + (min_spread + 2 * self.fee_pct) / 100.0
+        self._ratio_cpp = round(self._ratio * PRICE_SCALE)
+        # Stable int ids per event / platform, assigned on first sight
+        self.matcher = EventMatcher()
+        self._platform_ids: Dict[str, int] = {}
+    
+    def _platform_id(self, platform: str) -> int:
+        return self._platform_ids.setdefault(platform, len(self._platform_ids))
     
     def process_prices(self, prices: List[MarketPrice]) -> List[Dict]:
         opportunities = []
-        grouped = defaultdict(list)
+        n = len(prices)
+        if not n:
+            return opportunities
         
-        for price in prices:
-            key = f"{price.event_name.lower()}|{price.outcome}"
-            grouped[key].append(price)
+        # Structure-of-arrays view of this scan's prices
+        event_id = self.matcher.event_id
+        eids = np.fromiter((event_id(p.key, p.platform) for p in prices), dtype=np.int32, count=n)
+        pids = np.fromiter((self._platform_id(p.platform) for p in prices), dtype=np.int32, count=n)
+        mids = np.fromiter((p.mid_cpp for p in prices), dtype=np.int16, count=n)
         
-        for event_key, event_prices in grouped.items():
-            if len(event_prices) < 2:
-                continue
-            
-            platforms = {p.platform: p for p in event_prices}
-            platform_list = list(platforms.items())
-            
-            for i in range(len(platform_list)):
-                for j in range(i + 1, len(platform_list)):
-                    p1_name, p1 = platform_list[i]
-                    p2_name, p2 = platform_list[j]
-                    
-                    price1 = p1.mid
-                    price2 = p2.mid
-                    
-                    if price1 > price2:
-                        price1, price2 = price2, price1
-                        p1_name, p2_name = p2_name, p1_name
-                    
-                    spread = ((price2 - price1) / price1) * 100
-                    net_spread = spread - (2 * self.fee_pct)
-                    
-                    if net_spread >= self.min_spread:
-                        opportunities.append({
-                            'event': event_key,
-                            'buy_platform': p1_name,
-                            'buy_price': price1,
-                            'sell_platform': p2_name,
-                            'sell_price': price2,
-                            'net_spread': net_spread
-                        })
+        # Sort by event (then platform) so each event is one contiguous segment
+        order = np.lexsort((pids, eids))
+        buy_idx, sell_idx = find_opps(eids[order], pids[order], mids[order], self._ratio_cpp)
+        
+        for b, s in zip(order[buy_idx], order[sell_idx]):
+            buy = prices[b]
+            sell = prices[s]
+            # Exact spread from the float mids, only for the events reported
+            net_spread = (sell.mid - buy.mid) / buy.mid * 100 - 2 * self.fee_pct
+            name, outcome = buy.key
+            opportunities.append({
+                'event': f"{name}|{outcome}",
+                'buy_platform': buy.platform,
+                'buy_price': buy.mid,
+                'sell_platform': sell.platform,
+                'sell_price': sell.mid,
+                'net_spread': net_spread
+            })
         
         return opportunities
 
@@ -176,37 +595,73 @@ async def main():
     print("ARBITRAGE SCANNER")
     print("="*60 + "\n")
     
-    collectors = [
-        KalshiCollector(),
-        PolymarketCollector()
-    ]
-    
+    async with create_session() as session:
+        updated = asyncio.Event()
+        feeds = [PolymarketWSCollector(session, updated)]
+        # Kalshi's websocket API needs authenticated sessions, so it stays on REST
+        collectors = [KalshiCollector(session)]
+        
+        try:
+            for feed in feeds:
+                await feed.start()
+            await scan_loop(collectors, feeds, updated)
+        finally:
+            for feed in feeds:
+                await feed.close()
+
+async def scan_loop(collectors, feeds, updated: asyncio.Event):
     engine = ArbitrageEngine(min_spread=MIN_SPREAD_PCT)
+    loop = asyncio.get_running_loop()
     iteration = 0
+    polled_prices = []
+    next_poll = loop.time()
+    last_opportunities = None
     
     while True:
         try:
             iteration += 1
-            print(f"\n[Scan #{iteration}] {datetime.now().strftime('%H:%M:%S')}")
             
-            all_prices = []
-            for collector in collectors:
-                prices = await collector.fetch_markets()
-                all_prices.extend(prices)
+            # REST collectors are polled on a fixed cadence; feeds are always current
+            polled = loop.time() >= next_poll
+            if polled:
+                polled_prices = []
+                for collector in collectors:
+                    prices = await collector.fetch_markets()
+                    polled_prices.extend(prices)
+                # Deadline-based so fetch time doesn't stretch the period; if a
+                # fetch overran the interval, poll again now rather than replay ticks
+                next_poll = max(next_poll + POLL_INTERVAL, loop.time())
+            
+            updated.clear()
+            all_prices = list(polled_prices)
+            for feed in feeds:
+                all_prices.extend(feed.prices())
             
-            opportunities = engine.process_prices(all_prices)
+            # Off the event loop, so feed and HTTP callbacks keep running meanwhile
+            opportunities = await loop.run_in_executor(None, engine.process_prices, all_prices)
             
-            if opportunities:
-                print(f"\n FOUND {len(opportunities)} opportunities:\n")
-                for opp in opportunities:
-                    print(f"  {opp['event']}")
-                    print(f"    BUY {opp['buy_platform']:12} @ {opp['buy_price']:.4f}")
-                    print(f"    SELL {opp['sell_platform']:11} @ {opp['sell_price']:.4f}")
-                    print(f"    SPREAD: {opp['net_spread']:.2f}%\n")
+            # Feed updates rescan often; only report polls and changed results
+            if not polled and opportunities == last_opportunities:
+                logger.debug(f"Scan #{iteration}: {len(opportunities)} opportunities, unchanged")
             else:
-                print("  No opportunities found")
+                print(f"\n[Scan #{iteration}] {datetime.now().strftime('%H:%M:%S')}")
+                if opportunities:
+                    print(f"\n FOUND {len(opportunities)} opportunities:\n")
+                    for opp in opportunities:
+                        print(f"  {opp['event']}")
+                        print(f"    BUY {opp['buy_platform']:12} @ {opp['buy_price']:.4f}")
+                        print(f"    SELL {opp['sell_platform']:11} @ {opp['sell_price']:.4f}")
+                        print(f"    SPREAD: {opp['net_spread']:.2f}%\n")
+                else:
+                    print("  No opportunities found")
+            last_opportunities = opportunities
             
-            await asyncio.sleep(POLL_INTERVAL)
+            # Rescan on the next book update or when the next poll is due
+            try:
+                await asyncio.wait_for(updated.wait(), timeout=max(0, next_poll - loop.time()))
+                await asyncio.sleep(FEED_COALESCE)
+            except asyncio.TimeoutError:
+                pass
         
         except Exception as e:
             logger.error(f"Error: {e}")
@@ -214,7 +669,10 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\n\nScanner stopped")
         exit(0)
@@ -0,0 +1,92 @@
+import pytest
+
+from arbitrage_scanner import (
+    ArbitrageEngine, EventMatcher, MarketPrice, _book_side, _kalshi_dollars, _top, event_key
+)
+
+
+def quote(platform, title, bid, ask):
+    return MarketPrice(
+        platform=platform,
+        event_id=f"{platform}:{title}",
+        event_name=title,
+        outcome="YES",
+        bid=bid,
+        ask=ask,
+        timestamp=0.0
+    )
+
+
+def test_matcher_merges_reworded_title_across_platforms():
+    matcher = EventMatcher()
+    kalshi = matcher.event_id(event_key("Will BTC close above 100k on Dec 31?", "YES"), "Kalshi")
+    poly = matcher.event_id(event_key("BTC to close above 100k on December 31", "YES"), "Polymarket")
+    assert kalshi == poly
+
+
+def test_matcher_requires_numbers_and_dates_to_match():
+    matcher = EventMatcher()
+    low = matcher.event_id(event_key("Will BTC close above 100k on Dec 31?", "YES"), "Kalshi")
+    high = matcher.event_id(event_key("Will BTC close above 110k on Dec 31?", "YES"), "Polymarket")
+    later = matcher.event_id(event_key("Will BTC close above 100k on Jan 31?", "YES"), "Polymarket")
+    assert low != high
+    assert low != later
+
+
+def test_matcher_requires_direction_and_negation_to_match():
+    matcher = EventMatcher()
+    above = matcher.event_id(event_key("Will BTC close above 100k on Dec 31?", "YES"), "Kalshi")
+    below = matcher.event_id(event_key("Will BTC close below 100k on Dec 31?", "YES"), "Polymarket")
+    assert above != below
+    cut = matcher.event_id(event_key("Will the Fed cut rates in March 2025?", "YES"), "Kalshi")
+    no_cut = matcher.event_id(event_key("Will the Fed not cut rates in March 2025?", "YES"), "Polymarket")
+    assert cut != no_cut
+
+
+def test_matcher_never_merges_same_platform():
+    matcher = EventMatcher()
+    a = matcher.event_id(event_key("Will the Fed cut rates at the next meeting?", "YES"), "Kalshi")
+    b = matcher.event_id(event_key("Will the Fed cut rates at its next meeting?", "YES"), "Kalshi")
+    assert a != b
+
+
+def test_engine_no_false_arbitrage_across_strikes():
+    engine = ArbitrageEngine(min_spread=2.5)
+    prices = [
+        quote("Kalshi", "Will BTC close above 100k on Dec 31?", 0.29, 0.31),
+        quote("Polymarket", "Will BTC close above 110k on Dec 31?", 0.57, 0.59),
+        quote("Kalshi", "Will the Fed cut rates at the next meeting?", 0.29, 0.31),
+        quote("Kalshi", "Will the Fed cut rates at its next meeting?", 0.57, 0.59),
+    ]
+    assert engine.process_prices(prices) == []
+
+
+def test_engine_reports_cross_platform_opportunity():
+    engine = ArbitrageEngine(min_spread=2.5)
+    prices = [
+        quote("Kalshi", "Will BTC close above 100k on Dec 31?", 0.39, 0.41),
+        quote("Polymarket", "BTC to close above 100k on December 31", 0.49, 0.51),
+    ]
+    [opp] = engine.process_prices(prices)
+    assert opp['buy_platform'] == "Kalshi"
+    assert opp['sell_platform'] == "Polymarket"
+    assert (opp['buy_price'], opp['sell_price']) == (0.4, 0.5)
+    assert opp['net_spread'] == (opp['sell_price'] - opp['buy_price']) / opp['buy_price'] * 100 - 2.0
+
+
+def test_kalshi_cents_are_converted_to_dollars():
+    assert _kalshi_dollars(45, 47) == (0.45, 0.47)
+    assert _kalshi_dollars(None, 47) == (None, 0.47)
+    assert _kalshi_dollars(0.45, 0.47) == (0.45, 0.47)
+
+
+def test_out_of_range_quote_is_rejected():
+    with pytest.raises(ValueError):
+        quote("Kalshi", "Will BTC close above 100k on Dec 31?", 45, 47)
+
+
+def test_top_of_book_accepts_both_level_shapes_in_any_order():
+    bids = _book_side([{"price": "0.38", "size": "5"}, {"price": "0.40", "size": "2"}, ["0.45", "0"]])
+    asks = _book_side([["0.47", "1"], {"price": "0.42", "size": "3"}])
+    assert _top(bids, asks) == (0.40, 0.42)
+    assert _top(bids, {}) == (0.40, None)
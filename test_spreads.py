@@ -0,0 +1,52 @@
+import numpy as np
+
+from _spreads import PRICE_SCALE, _find_opps_loop, _find_opps_numpy
+
+RATIO = round(1.045 * PRICE_SCALE)
+
+
+def run_both(eids, pids, mids):
+    args = (
+        np.array(eids, dtype=np.int32),
+        np.array(pids, dtype=np.int32),
+        np.array(mids, dtype=np.int16),
+        RATIO
+    )
+    loop = _find_opps_loop(*args)
+    vec = _find_opps_numpy(*args)
+    for a, b in zip(loop, vec):
+        np.testing.assert_array_equal(a, b)
+    return [a.tolist() for a in loop]
+
+
+def test_kernels_agree_on_tied_mids():
+    # Event 0: platforms 1 and 2 tie on the high mid, 0 and 3 on the low one
+    buys, sells = run_both(
+        [0, 0, 0, 0],
+        [0, 1, 2, 3],
+        [4000, 5000, 5000, 4000]
+    )
+    assert buys == [0]
+    assert sells == [1]
+
+
+def test_kernels_agree_on_duplicate_platform_run():
+    # Platform 1 quotes event 0 twice; only its last entry (6000) counts
+    buys, sells = run_both(
+        [0, 0, 0, 1, 1],
+        [0, 1, 1, 0, 1],
+        [5000, 3000, 6000, 5000, 5100]
+    )
+    assert buys == [0]
+    assert sells == [2]
+
+
+def test_kernels_agree_on_random_books():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(1, 40))
+        eids = np.sort(rng.integers(0, 8, n))
+        pids = rng.integers(0, 4, n)
+        order = np.lexsort((pids, eids))
+        mids = rng.choice([2000, 2500, 3000, 5000], n)
+        run_both(eids[order], pids[order], mids[order])